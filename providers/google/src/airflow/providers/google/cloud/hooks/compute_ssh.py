@@ -16,20 +16,28 @@
 # under the License.
 from __future__ import annotations
 
+import asyncio
+import atexit
 import random
 import shlex
+import subprocess
+import threading
 import time
-from functools import cached_property
+from collections import defaultdict, deque
+from concurrent.futures import Future
+from functools import cached_property, partial
 from io import StringIO
-from typing import Any
+from typing import TYPE_CHECKING, Any, ClassVar
 
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ed25519
 from googleapiclient.errors import HttpError
 from paramiko.ssh_exception import SSHException
 
 from airflow.exceptions import AirflowException
 from airflow.providers.google.cloud.hooks.compute import ComputeEngineHook
 from airflow.providers.google.cloud.hooks.os_login import OSLoginHook
-from airflow.providers.google.common.hooks.base_google import PROVIDE_PROJECT_ID
+from airflow.providers.google.common.hooks.base_google import PROVIDE_PROJECT_ID, get_field
 from airflow.providers.ssh.hooks.ssh import SSHHook
 from airflow.utils.types import NOTSET, ArgNotSet
 
@@ -38,33 +46,145 @@ from airflow.utils.types import NOTSET, ArgNotSet
 # TODO:(potiuk) We should add test harness detecting such cases shortly
 import paramiko  # isort:skip
 
+if TYPE_CHECKING:
+    from collections.abc import Callable
+
 CMD_TIMEOUT = 10
 
+# Generated keys are not reused once they are closer than this many seconds to their expiration.
+# For short ``expire_time`` values the margin is capped at half of the key lifetime.
+SSH_KEY_EXPIRY_MARGIN = 60
+
+# Time in seconds to wait for the IAP tunnel process to exit after its connection is closed.
+PROXY_COMMAND_TERMINATE_TIMEOUT = 5
+
+# Maximum number of idle connections kept in the pool for a single target.
+SSH_POOL_MAX_SIZE = 8
+
+_SSH_POOL: dict[tuple, deque[_GCloudAuthorizedSSHClient]] = {}
+_SSH_POOL_LOCK = threading.Lock()
+
+# Connections whose transport is shared by the sessions opened with ComputeEngineSSHHook.get_session().
+_SHARED_CLIENTS: dict[tuple, _GCloudAuthorizedSSHClient] = {}
+_SHARED_CLIENT_LOCKS: defaultdict[tuple, threading.Lock] = defaultdict(threading.Lock)
+
+
+def _boolify(value) -> bool:
+    return value is True or (isinstance(value, str) and value.lower() == "true")
+
+
+def _intify(key, value, default):
+    if value is None:
+        return default
+    if isinstance(value, str) and value.strip() == "":
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise AirflowException(
+            f"The {key} field should be a integer. "
+            f'Current value: "{value}" (type: {type(value)}). '
+            f"Please check the connection configuration."
+        )
+
+
+def _reap_proxy_command(sock) -> None:
+    """Wait for the process of a closed ProxyCommand, so that no defunct tunnel processes are left."""
+    process = getattr(sock, "process", None)
+    if process is None:
+        return
+    try:
+        process.wait(timeout=PROXY_COMMAND_TERMINATE_TIMEOUT)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def _is_client_alive(client: paramiko.SSHClient) -> bool:
+    transport = client.get_transport()
+    if transport is None or not transport.is_active():
+        return False
+    # The IAP tunnel process lives as long as the connection going through it; if it exited,
+    # the connection cannot be reused.
+    process = getattr(transport.sock, "process", None)
+    if process is not None and process.poll() is not None:
+        return False
+    try:
+        transport.send_ignore()
+    except (EOFError, OSError, SSHException):
+        return False
+    return True
+
+
+def _release_ssh_client(pool_key: tuple, client: _GCloudAuthorizedSSHClient) -> bool:
+    """Return the client to the pool. Returns False if the client should be closed instead."""
+    if not _is_client_alive(client):
+        return False
+    with _SSH_POOL_LOCK:
+        idle_clients = _SSH_POOL.setdefault(pool_key, deque())
+        if client in idle_clients:
+            # Closing an already released client again must not hand it out to two callers.
+            return True
+        if len(idle_clients) >= SSH_POOL_MAX_SIZE:
+            return False
+        idle_clients.append(client)
+    return True
+
+
+def _acquire_ssh_client(pool_key: tuple) -> _GCloudAuthorizedSSHClient | None:
+    """Take a live client from the pool, closing any stale ones found on the way."""
+    while True:
+        with _SSH_POOL_LOCK:
+            idle_clients = _SSH_POOL.get(pool_key)
+            if not idle_clients:
+                return None
+            client = idle_clients.pop()
+        if _is_client_alive(client):
+            return client
+        client.pool_key = None
+        client.close()
+
 
 class _GCloudAuthorizedSSHClient(paramiko.SSHClient):
-    """SSH Client that maintains the context for gcloud authorization during the connection."""
+    """
+    SSH Client that maintains the context for gcloud authorization during the connection handshake.
+
+    If ``pool_key`` is set, closing the client returns it to the connection pool instead of
+    tearing down the transport.
+    """
 
     def __init__(self, google_hook, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.ssh_client = paramiko.SSHClient()
         self.google_hook = google_hook
         self.decorator = None
+        self.pool_key: tuple | None = None
 
     def connect(self, *args, **kwargs):
+        # The gcloud context patches the environment of the whole process, so it is only kept for
+        # the time of the handshake and never while the connection is in use or idle in the pool.
         self.decorator = self.google_hook.provide_authorized_gcloud()
         self.decorator.__enter__()
-        return super().connect(*args, **kwargs)
+        try:
+            return super().connect(*args, **kwargs)
+        finally:
+            self.decorator.__exit__(None, None, None)
+            self.decorator = None
 
     def close(self):
-        if self.decorator:
-            self.decorator.__exit__(None, None, None)
-        self.decorator = None
-        return super().close()
+        if self.pool_key is not None and _release_ssh_client(self.pool_key, self):
+            return None
+        self.pool_key = None
+        transport = self.get_transport()
+        result = super().close()
+        if transport is not None:
+            _reap_proxy_command(transport.sock)
+        return result
 
     def __exit__(self, type_, value, traceback):
-        if self.decorator:
-            self.decorator.__exit__(type_, value, traceback)
-        self.decorator = None
+        if type_ is not None:
+            # Do not hand a client that failed mid-use back to the pool.
+            self.pool_key = None
         return super().__exit__(type_, value, traceback)
 
 
@@ -84,9 +204,24 @@ class ComputeEngineSSHHook(SSHHook):
     :param use_oslogin: Whether to manage keys using OsLogin API. If false,
         keys are managed using instance metadata
     :param expire_time: The maximum amount of time in seconds before the private key expires
+    :param cmd_timeout: Timeout (in seconds) for executing the command on the instance. The default
+        is 10 seconds. Nullable, ``None`` means no timeout. If provided, it will replace the
+        ``cmd_timeout`` which was predefined in the connection of ``gcp_conn_id``.
     :param gcp_conn_id: The connection id to use when fetching connection information
-    :param max_retries: Maximum number of retries the process will try to establish connection to instance.
+    :param max_retries: Maximum number of retries the process will try to establish connection to instance
+        and to update the instance metadata when it was modified concurrently.
         Could be decreased/increased by user based on the amount of parallel SSH connections to the instance.
+    :param reuse_connection: Whether to keep SSH connections in a pool after they are closed and reuse
+        them for subsequent connections to the same instance. Use :meth:`close_pool` to close all
+        pooled connections.
+    :param base_delay: The delay in seconds before the first retry. The delay doubles with every
+        following retry.
+    :param max_delay: The maximum delay in seconds between retries.
+    :param jitter: Whether to randomize the delay between retries, so that parallel connections
+        to the same instance do not retry at the same time.
+    :param handshake_timeout: The time in seconds during which a single connection attempt retries the
+        TCP connection and the SSH handshake before giving up.
+    :param key_type: The type of the generated SSH key, either ``ed25519`` or ``rsa``.
     :param impersonation_chain: Optional. The service account email to impersonate using short-term
         credentials. The provided service account must grant the originating account
         the Service Account Token Creator IAM role and have the sufficient rights to perform the request
@@ -97,6 +232,11 @@ class ComputeEngineSSHHook(SSHHook):
     conn_type = "gcpssh"
     hook_name = "Google Cloud SSH"
 
+    # Authorizations in progress, shared so that concurrent connections to the same instance
+    # authorize a single key instead of calling the OS Login or Compute Engine API each.
+    _INFLIGHT: ClassVar[dict[tuple, Future]] = {}
+    _INFLIGHT_LOCK: ClassVar[threading.Lock] = threading.Lock()
+
     @classmethod
     def get_ui_field_behaviour(cls) -> dict[str, Any]:
         return {
@@ -116,9 +256,15 @@ class ComputeEngineSSHHook(SSHHook):
         use_iap_tunnel: bool = False,
         use_oslogin: bool = True,
         expire_time: int = 300,
-        cmd_timeout: int | ArgNotSet = NOTSET,
+        cmd_timeout: float | ArgNotSet | None = NOTSET,
         max_retries: int = 10,
         impersonation_chain: str | None = None,
+        reuse_connection: bool = True,
+        base_delay: float = 1.0,
+        max_delay: float = 30.0,
+        jitter: bool = True,
+        handshake_timeout: float = 30.0,
+        key_type: str = "ed25519",
         **kwargs,
     ) -> None:
         # Ignore original constructor
@@ -136,7 +282,18 @@ class ComputeEngineSSHHook(SSHHook):
         self.cmd_timeout = cmd_timeout
         self.max_retries = max_retries
         self.impersonation_chain = impersonation_chain
+        self.reuse_connection = reuse_connection
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+        self.handshake_timeout = handshake_timeout
+        if key_type not in ("ed25519", "rsa"):
+            raise ValueError(f"Unsupported key_type: {key_type}. Supported key types: ed25519, rsa.")
+        self.key_type = key_type
         self._conn: Any | None = None
+        self._ssh_keys: dict[str, tuple[paramiko.PKey, str, float]] = {}
+        self._config_loaded = False
+        self._oslogin_key: tuple[str, str, float] | None = None
 
     @cached_property
     def _oslogin_hook(self) -> OSLoginHook:
@@ -150,66 +307,156 @@ class ComputeEngineSSHHook(SSHHook):
             )
         return ComputeEngineHook(gcp_conn_id=self.gcp_conn_id)
 
-    def _load_connection_config(self):
-        def _boolify(value):
-            if isinstance(value, bool):
-                return value
-            if isinstance(value, str):
-                if value.lower() == "false":
-                    return False
-                if value.lower() == "true":
-                    return True
-            return False
+    @cached_property
+    def _resolved_hostname(self) -> str:
+        if self.hostname:
+            return self.hostname
+        return self._compute_hook.get_instance_address(
+            zone=self.zone,
+            resource_id=self.instance_name,
+            project_id=self.project_id,
+            use_internal_ip=self.use_internal_ip or self.use_iap_tunnel,
+        )
 
-        def intify(key, value, default):
-            if value is None:
-                return default
-            if isinstance(value, str) and value.strip() == "":
-                return default
-            try:
-                return int(value)
-            except ValueError:
-                raise AirflowException(
-                    f"The {key} field should be a integer. "
-                    f'Current value: "{value}" (type: {type(value)}). '
-                    f"Please check the connection configuration."
-                )
+    def refresh(self) -> None:
+        """Reload the connection configuration and the instance address on the next connection."""
+        self._config_loaded = False
+        self.__dict__.pop("_resolved_hostname", None)
+
+    def _load_connection_config(self):
+        if self._config_loaded:
+            return
 
         conn = self.get_connection(self.gcp_conn_id)
         if conn and conn.conn_type == "gcpssh":
-            self.instance_name = self._compute_hook._get_field("instance_name", self.instance_name)
-            self.zone = self._compute_hook._get_field("zone", self.zone)
+            extra_options = conn.extra_dejson
+            self.instance_name = get_field(extra_options, "instance_name") or self.instance_name
+            self.zone = get_field(extra_options, "zone") or self.zone
             self.user = conn.login if conn.login else self.user
             # self.project_id is skipped intentionally
             self.hostname = conn.host if conn.host else self.hostname
-            self.use_internal_ip = _boolify(self._compute_hook._get_field("use_internal_ip"))
-            self.use_iap_tunnel = _boolify(self._compute_hook._get_field("use_iap_tunnel"))
-            self.use_oslogin = _boolify(self._compute_hook._get_field("use_oslogin"))
-            self.expire_time = intify(
+            self.use_internal_ip = _boolify(get_field(extra_options, "use_internal_ip"))
+            self.use_iap_tunnel = _boolify(get_field(extra_options, "use_iap_tunnel"))
+            self.use_oslogin = _boolify(get_field(extra_options, "use_oslogin"))
+            self.expire_time = _intify(
                 "expire_time",
-                self._compute_hook._get_field("expire_time"),
+                get_field(extra_options, "expire_time"),
                 self.expire_time,
             )
 
-            if conn.extra is not None:
-                extra_options = conn.extra_dejson
-                if "cmd_timeout" in extra_options and self.cmd_timeout is NOTSET:
-                    if extra_options["cmd_timeout"]:
-                        self.cmd_timeout = int(extra_options["cmd_timeout"])
-                    else:
-                        self.cmd_timeout = None
+            if "cmd_timeout" in extra_options and self.cmd_timeout is NOTSET:
+                if extra_options["cmd_timeout"]:
+                    self.cmd_timeout = float(extra_options["cmd_timeout"])
+                else:
+                    self.cmd_timeout = None
 
-            if self.cmd_timeout is NOTSET:
-                self.cmd_timeout = CMD_TIMEOUT
+        if self.cmd_timeout is NOTSET:
+            self.cmd_timeout = CMD_TIMEOUT
+        self._config_loaded = True
 
     def get_conn(self) -> paramiko.SSHClient:
         """Return SSH connection."""
+        hostname, pool_key = self._prepare_connect_args()
+        if pool_key is not None:
+            pooled_client = _acquire_ssh_client(pool_key)
+            if pooled_client is not None:
+                self.log.info("Reusing pooled SSH connection to host: hostname=%s", hostname)
+                return pooled_client
+
+        sshclient = self._connect(hostname)
+        sshclient.pool_key = pool_key
+        return sshclient
+
+    def get_session(self) -> paramiko.Channel:
+        """
+        Open a new session on a connection shared by all hooks connecting to the same instance.
+
+        Sessions are multiplexed on a single SSH transport, so running many commands concurrently
+        does not open a new connection for each of them. Close the returned channel when done,
+        the shared connection stays open until :meth:`close_pool` is called.
+        """
+        hostname, _ = self._prepare_connect_args()
+        shared_key = (*self._get_pool_key(hostname), self._get_proxy_command())
+        with _SSH_POOL_LOCK:
+            shared_client_lock = _SHARED_CLIENT_LOCKS[shared_key]
+        with shared_client_lock:
+            sshclient = _SHARED_CLIENTS.get(shared_key)
+            if sshclient is None or not _is_client_alive(sshclient):
+                if sshclient is not None:
+                    sshclient.close()
+                sshclient = _SHARED_CLIENTS[shared_key] = self._connect(hostname)
+        return sshclient.get_transport().open_session()
+
+    def _connect(self, hostname: str) -> _GCloudAuthorizedSSHClient:
+        credentials = list(self._get_authorized_key())
+
+        proxy_command = self._get_proxy_command()
+
+        sshclient = None
+        for retry in range(self.max_retries + 1):
+            try:
+                sshclient = self._connect_attempt(credentials, hostname, proxy_command)
+                break
+            except SSHException as exc:
+                time.sleep(self._get_connect_retry_delay(retry, exc))
+        if not sshclient:
+            raise AirflowException("Unable to establish SSH connection.")
+        return sshclient
+
+    async def aget_conn(self) -> paramiko.SSHClient:
+        """
+        Return SSH connection without blocking the event loop.
+
+        The blocking calls are run in the default executor of the running event loop and the waits
+        between retries are done with ``asyncio.sleep``, so that many connections can be established
+        concurrently from a single event loop.
+        """
+        loop = asyncio.get_running_loop()
+        hostname, pool_key = await loop.run_in_executor(None, self._prepare_connect_args)
+        if pool_key is not None:
+            pooled_client = await loop.run_in_executor(None, _acquire_ssh_client, pool_key)
+            if pooled_client is not None:
+                self.log.info("Reusing pooled SSH connection to host: hostname=%s", hostname)
+                return pooled_client
+
+        credentials = list(await loop.run_in_executor(None, self._get_authorized_key))
+
+        proxy_command = self._get_proxy_command()
+
+        sshclient = None
+        for retry in range(self.max_retries + 1):
+            try:
+                sshclient = await loop.run_in_executor(
+                    None, self._connect_attempt, credentials, hostname, proxy_command
+                )
+                break
+            except SSHException as exc:
+                await asyncio.sleep(self._get_connect_retry_delay(retry, exc))
+        if not sshclient:
+            raise AirflowException("Unable to establish SSH connection.")
+        sshclient.pool_key = pool_key
+        return sshclient
+
+    def _connect_attempt(self, credentials: list, hostname, proxy_command) -> _GCloudAuthorizedSSHClient:
+        """
+        Make a single connection attempt, importing the OS Login key again if it is about to expire.
+
+        :param credentials: The ``[user, privkey]`` pair used for the connection. It is updated in place
+            when the key is imported again, so that the following attempts use the new key.
+        """
+        if self._is_oslogin_key_expiring():
+            credentials[:] = self._get_authorized_key()
+        user, privkey = credentials
+        return self._connect_to_instance(user, hostname, privkey, proxy_command)
+
+    def _prepare_connect_args(self) -> tuple[str, tuple | None]:
+        """Load and validate the configuration, and return the hostname and the connection pool key."""
         self._load_connection_config()
         if not self.project_id:
             self.project_id = self._compute_hook.project_id
 
-        missing_fields = [k for k in ["instance_name", "zone", "project_id"] if not getattr(self, k)]
-        if not self.instance_name or not self.zone or not self.project_id:
+        if not (self.instance_name and self.zone and self.project_id):
+            missing_fields = [k for k in ("instance_name", "zone", "project_id") if not getattr(self, k)]
             raise AirflowException(
                 f"Required parameters are missing: {missing_fields}. These parameters be passed either as "
                 "keyword parameter or as extra field in Airflow connection definition. Both are not set!"
@@ -225,113 +472,210 @@ class ComputeEngineSSHHook(SSHHook):
             self.use_iap_tunnel,
             self.use_oslogin,
         )
-        if not self.hostname:
-            hostname = self._compute_hook.get_instance_address(
-                zone=self.zone,
-                resource_id=self.instance_name,
-                project_id=self.project_id,
-                use_internal_ip=self.use_internal_ip or self.use_iap_tunnel,
-            )
+        hostname = self._resolved_hostname
+        pool_key = self._get_pool_key(hostname) if self.reuse_connection else None
+        return hostname, pool_key
+
+    def _get_connect_retry_delay(self, retry: int, exc: SSHException) -> float:
+        """Log the failed connection attempt and return the delay before the next one."""
+        self.log.info("Error occurred when establishing SSH connection using Paramiko: %s", exc)
+        if retry == self.max_retries:
+            raise AirflowException("Maximum retries exceeded. Aborting operation.")
+        delay = self._get_retry_delay(retry)
+        self.log.info("Failed establish SSH connection, waiting %.2f seconds to retry...", delay)
+        return delay
+
+    def _get_authorized_key(self) -> tuple[str, paramiko.PKey]:
+        """
+        Return the remote user and a private key authorized to log in to the instance.
+
+        If another thread is already authorizing a key for the same instance and identity, wait for
+        it and use its result instead of authorizing another key.
+        """
+        inflight_key = (
+            self.instance_name,
+            self.zone,
+            self.project_id,
+            self.user,
+            self.use_oslogin,
+            self.gcp_conn_id,
+            self.impersonation_chain,
+        )
+        with self._INFLIGHT_LOCK:
+            future = self._INFLIGHT.get(inflight_key)
+            is_owner = future is None
+            if is_owner:
+                future = self._INFLIGHT[inflight_key] = Future()
+        if not is_owner:
+            self.log.info("Waiting for SSH key authorization in progress for the instance")
+            return future.result()
+
+        try:
+            privkey, pubkey = self._get_ssh_key(self.user)
+            user = self._authorize(pubkey)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
         else:
-            hostname = self.hostname
+            future.set_result((user, privkey))
+        finally:
+            with self._INFLIGHT_LOCK:
+                self._INFLIGHT.pop(inflight_key, None)
+        return user, privkey
+
+    def _authorize(self, pubkey: str) -> str:
+        if self.use_oslogin:
+            if self._oslogin_key and self._oslogin_key[0] == pubkey:
+                if not self._is_oslogin_key_expiring():
+                    return self._oslogin_key[1]
+                self.log.info("SSH public key imported using OSLogin is about to expire, importing it again")
+            return self._authorize_os_login(pubkey)
+        self._authorize_compute_engine_instance_metadata(pubkey)
+        return self.user
+
+    def _get_proxy_command(self) -> str | None:
+        if not self.use_iap_tunnel:
+            return None
+        proxy_command_args = [
+            "gcloud",
+            "compute",
+            "start-iap-tunnel",
+            str(self.instance_name),
+            "22",
+            "--listen-on-stdin",
+            f"--project={self.project_id}",
+            f"--zone={self.zone}",
+            "--verbosity=warning",
+        ]
+        if self.impersonation_chain:
+            proxy_command_args.append(f"--impersonate-service-account={self.impersonation_chain}")
+        return " ".join(shlex.quote(arg) for arg in proxy_command_args)
+
+    def _get_retry_delay(self, retry: int) -> float:
+        """Return the exponential backoff delay before the given retry, optionally with jitter."""
+        delay = min(self.max_delay, self.base_delay * 2**retry)
+        if self.jitter:
+            delay *= 0.5 + random.random() / 2
+        return delay
+
+    def _get_pool_key(self, hostname: str) -> tuple:
+        # The credentials are part of the key, so that a connection authorized for one identity
+        # is never handed out to a hook using another one.
+        return (
+            hostname,
+            self.user,
+            self.project_id,
+            self.use_iap_tunnel,
+            self.use_oslogin,
+            self.gcp_conn_id,
+            self.impersonation_chain,
+        )
 
-        privkey, pubkey = self._generate_ssh_key(self.user)
-
-        max_delay = 10
-        sshclient = None
-        for retry in range(self.max_retries + 1):
-            try:
-                if self.use_oslogin:
-                    user = self._authorize_os_login(pubkey)
-                else:
-                    user = self.user
-                    self._authorize_compute_engine_instance_metadata(pubkey)
-                proxy_command = None
-                if self.use_iap_tunnel:
-                    proxy_command_args = [
-                        "gcloud",
-                        "compute",
-                        "start-iap-tunnel",
-                        str(self.instance_name),
-                        "22",
-                        "--listen-on-stdin",
-                        f"--project={self.project_id}",
-                        f"--zone={self.zone}",
-                        "--verbosity=warning",
-                    ]
-                    if self.impersonation_chain:
-                        proxy_command_args.append(f"--impersonate-service-account={self.impersonation_chain}")
-                    proxy_command = " ".join(shlex.quote(arg) for arg in proxy_command_args)
-                sshclient = self._connect_to_instance(user, hostname, privkey, proxy_command)
-                break
-            except (HttpError, AirflowException, SSHException) as exc:
-                if (isinstance(exc, HttpError) and exc.resp.status == 412) or (
-                    isinstance(exc, AirflowException) and "412 PRECONDITION FAILED" in str(exc)
-                ):
-                    self.log.info("Error occurred when trying to update instance metadata: %s", exc)
-                elif isinstance(exc, SSHException):
-                    self.log.info("Error occurred when establishing SSH connection using Paramiko: %s", exc)
-                else:
-                    raise
-                if retry == self.max_retries:
-                    raise AirflowException("Maximum retries exceeded. Aborting operation.")
-                delay = random.randint(0, max_delay)
-                self.log.info("Failed establish SSH connection, waiting %s seconds to retry...", delay)
-                time.sleep(delay)
-        if not sshclient:
-            raise AirflowException("Unable to establish SSH connection.")
-        return sshclient
+    @staticmethod
+    def close_pool() -> None:
+        """Close all idle SSH connections kept in the connection pool and all shared connections."""
+        with _SSH_POOL_LOCK:
+            idle_clients = [client for clients in _SSH_POOL.values() for client in clients]
+            idle_clients.extend(_SHARED_CLIENTS.values())
+            _SSH_POOL.clear()
+            _SHARED_CLIENTS.clear()
+        for client in reversed(idle_clients):
+            client.pool_key = None
+            client.close()
 
     def _connect_to_instance(self, user, hostname, pkey, proxy_command) -> paramiko.SSHClient:
         self.log.info("Opening remote connection to host: username=%s, hostname=%s", user, hostname)
-        max_time_to_wait = 5
-        for time_to_wait in range(max_time_to_wait + 1):
+        deadline = time.monotonic() + self.handshake_timeout
+        attempt = 0
+        while True:
+            client = None
+            # Bound the TCP connection and the banner exchange by the time left until the deadline.
+            timeout = max(deadline - time.monotonic(), 1.0)
             try:
                 client = _GCloudAuthorizedSSHClient(self._compute_hook)
                 # Default is RejectPolicy
                 # No known host checking since we are not storing privatekey
                 client.set_missing_host_key_policy(paramiko.AutoAddPolicy())  # nosec B507
+                # ProxyCommand spawns the tunnel process, so it is only created right before connecting
+                sock = paramiko.ProxyCommand(proxy_command) if proxy_command else None
                 client.connect(
                     hostname=hostname,
                     username=user,
                     pkey=pkey,
-                    sock=paramiko.ProxyCommand(proxy_command) if proxy_command else None,
+                    sock=sock,
                     look_for_keys=False,
+                    timeout=timeout,
+                    banner_timeout=timeout,
                 )
                 return client
-            except paramiko.SSHException:
-                if time_to_wait == max_time_to_wait:
+            except (paramiko.SSHException, OSError):
+                if client is not None:
+                    # Also closes the tunnel process, if any, and the transport thread
+                    client.close()
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
                     raise
-            self.log.info("Failed to connect. Waiting %ds to retry", time_to_wait)
+            time_to_wait = min(self._get_retry_delay(attempt), remaining)
+            self.log.info("Failed to connect. Waiting %.2fs to retry", time_to_wait)
             time.sleep(time_to_wait)
-        raise AirflowException("Can not connect to instance")
+            attempt += 1
 
     def _authorize_compute_engine_instance_metadata(self, pubkey):
         self.log.info("Appending SSH public key to instance metadata")
+        self._metadata_cas_retry(
+            partial(self._append_ssh_key_to_instance_metadata, pubkey), attempts=self.max_retries + 1
+        )
+
+    def _append_ssh_key_to_instance_metadata(self, pubkey):
         instance_info = self._compute_hook.get_instance_info(
             zone=self.zone, resource_id=self.instance_name, project_id=self.project_id
         )
 
-        keys = self.user + ":" + pubkey + "\n"
+        keys = f"{self.user}:{pubkey}\n"
         metadata = instance_info["metadata"]
-        items = metadata.get("items", [])
-        for item in items:
-            if item.get("key") == "ssh-keys":
-                keys += item["value"]
-                item["value"] = keys
-                break
+        items = metadata.setdefault("items", [])
+        ssh_keys_item = next((item for item in items if item.get("key") == "ssh-keys"), None)
+        if ssh_keys_item is not None:
+            if keys.rstrip("\n") in ssh_keys_item["value"].splitlines():
+                # The cached key pair is already authorized, there is no need to add it again.
+                self.log.info("SSH public key is already present in instance metadata")
+                return
+            ssh_keys_item["value"] = "".join([keys, ssh_keys_item["value"]])
         else:
-            new_dict = {"key": "ssh-keys", "value": keys}
-            metadata["items"] = [*items, new_dict]
+            items.append({"key": "ssh-keys", "value": keys})
 
+        # The fingerprint read above is sent back, so the update fails with 412 PRECONDITION FAILED
+        # if the metadata was modified in the meantime.
+        self.log.info("Updating instance metadata: fingerprint=%s", metadata.get("fingerprint"))
         self._compute_hook.set_instance_metadata(
             zone=self.zone, resource_id=self.instance_name, metadata=metadata, project_id=self.project_id
         )
 
+    def _metadata_cas_retry(self, fn: Callable[[], Any], attempts: int) -> Any:
+        """Call the instance metadata read-modify-write function, retrying on concurrent modification."""
+        if attempts < 1:
+            raise ValueError(f"attempts must be a positive integer, got {attempts}")
+        for attempt in range(attempts):
+            try:
+                return fn()
+            except (HttpError, AirflowException) as exc:
+                if not (
+                    (isinstance(exc, HttpError) and exc.resp.status == 412)
+                    or (isinstance(exc, AirflowException) and "412 PRECONDITION FAILED" in str(exc))
+                ):
+                    raise
+                self.log.info("Error occurred when trying to update instance metadata: %s", exc)
+                if attempt == attempts - 1:
+                    raise AirflowException("Maximum retries exceeded. Aborting operation.") from exc
+                delay = self._get_retry_delay(attempt)
+                self.log.info("Failed to update instance metadata, waiting %.2f seconds to retry...", delay)
+                time.sleep(delay)
+
     def _authorize_os_login(self, pubkey):
         username = self._oslogin_hook._get_credentials_email
         self.log.info("Importing SSH public key using OSLogin: user=%s", username)
-        expiration = int((time.time() + self.expire_time) * 1000000)
+        expires_at = time.time() + self.expire_time
+        expiration = int(expires_at * 1000000)
         ssh_public_key = {"key": pubkey, "expiration_time_usec": expiration}
         response = self._oslogin_hook.import_ssh_public_key(
             user=username, ssh_public_key=ssh_public_key, project_id=self.project_id
@@ -339,15 +683,45 @@ class ComputeEngineSSHHook(SSHHook):
         profile = response.login_profile
         account = profile.posix_accounts[0]
         user = account.username
+        self._oslogin_key = (pubkey, user, expires_at)
         return user
 
+    @property
+    def _key_expiry_margin(self) -> float:
+        """Return the time in seconds before the expiration of a key from which it is no longer used."""
+        return min(SSH_KEY_EXPIRY_MARGIN, self.expire_time / 2)
+
+    def _is_oslogin_key_expiring(self) -> bool:
+        """Check whether the key imported by this hook using OSLogin is close to its expiration."""
+        return self._oslogin_key is not None and self._oslogin_key[2] - time.time() < self._key_expiry_margin
+
+    def _get_ssh_key(self, user):
+        """Return the key pair generated for the user, generating a new one when it is about to expire."""
+        cached_key = self._ssh_keys.get(user)
+        if cached_key:
+            pkey_obj, pubkey, created_at = cached_key
+            if time.monotonic() - created_at < self.expire_time - self._key_expiry_margin:
+                return pkey_obj, pubkey
+        pkey_obj, pubkey = self._generate_ssh_key(user)
+        self._ssh_keys[user] = (pkey_obj, pubkey, time.monotonic())
+        return pkey_obj, pubkey
+
     def _generate_ssh_key(self, user):
         try:
             self.log.info("Generating ssh keys...")
-            pkey_file = StringIO()
-            pkey_obj = paramiko.RSAKey.generate(2048)
-            pkey_obj.write_private_key(pkey_file)
+            if self.key_type == "ed25519":
+                private_key = ed25519.Ed25519PrivateKey.generate().private_bytes(
+                    encoding=serialization.Encoding.PEM,
+                    format=serialization.PrivateFormat.OpenSSH,
+                    encryption_algorithm=serialization.NoEncryption(),
+                )
+                pkey_obj = paramiko.Ed25519Key(file_obj=StringIO(private_key.decode()))
+            else:
+                pkey_obj = paramiko.RSAKey.generate(2048)
             pubkey = f"{pkey_obj.get_name()} {pkey_obj.get_base64()} {user}"
             return pkey_obj, pubkey
         except (OSError, paramiko.SSHException) as err:
             raise AirflowException(f"Error encountered creating ssh keys, {err}")
+
+
+atexit.register(ComputeEngineSSHHook.close_pool)
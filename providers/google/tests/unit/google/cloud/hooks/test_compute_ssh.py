@@ -18,6 +18,9 @@ from __future__ import annotations
 
 import json
 import logging
+import os
+from concurrent.futures import Future
+from contextlib import contextmanager
 from unittest import mock
 
 import httplib2
@@ -27,8 +30,10 @@ from paramiko.ssh_exception import SSHException
 
 from airflow.exceptions import AirflowException
 from airflow.models import Connection
+from airflow.providers.google.cloud.hooks import compute_ssh
 from airflow.providers.google.cloud.hooks.compute_ssh import ComputeEngineSSHHook
 from airflow.providers.google.cloud.hooks.os_login import OSLoginHook
+from airflow.utils.types import NOTSET
 
 TEST_PROJECT_ID = "test-project-id"
 
@@ -41,6 +46,17 @@ TEST_PUB_KEY2 = "root:NAME MNJ root"
 IMPERSONATION_CHAIN = "SERVICE_ACCOUNT"
 
 
+@pytest.fixture(autouse=True)
+def clear_ssh_pool():
+    compute_ssh._SSH_POOL.clear()
+    compute_ssh._SHARED_CLIENTS.clear()
+    ComputeEngineSSHHook._INFLIGHT.clear()
+    yield
+    compute_ssh._SSH_POOL.clear()
+    compute_ssh._SHARED_CLIENTS.clear()
+    ComputeEngineSSHHook._INFLIGHT.clear()
+
+
 class TestComputeEngineHookWithPassedProjectId:
     def test_os_login_hook(self, mocker):
         mock_os_login_hook = mocker.patch.object(OSLoginHook, "__init__", return_value=None, spec=OSLoginHook)
@@ -59,8 +75,8 @@ class TestComputeEngineHookWithPassedProjectId:
     @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh._GCloudAuthorizedSSHClient")
     def test_get_conn_default_configuration(self, mock_ssh_client, mock_paramiko, mock_compute_hook, mocker):
         mock_paramiko.SSHException = RuntimeError
-        mock_paramiko.RSAKey.generate.return_value.get_name.return_value = "NAME"
-        mock_paramiko.RSAKey.generate.return_value.get_base64.return_value = "AYZ"
+        mock_paramiko.Ed25519Key.return_value.get_name.return_value = "NAME"
+        mock_paramiko.Ed25519Key.return_value.get_base64.return_value = "AYZ"
 
         mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
         mock_compute_hook.return_value.get_instance_address.return_value = EXTERNAL_IP
@@ -79,7 +95,7 @@ class TestComputeEngineHookWithPassedProjectId:
         result = hook.get_conn()
         assert mock_ssh_client.return_value == result
 
-        mock_paramiko.RSAKey.generate.assert_called_once_with(2048)
+        mock_paramiko.Ed25519Key.assert_called_once_with(file_obj=mock.ANY)
         mock_compute_hook.assert_has_calls(
             [
                 mock.call(gcp_conn_id="google_cloud_default"),
@@ -103,7 +119,9 @@ class TestComputeEngineHookWithPassedProjectId:
                 mock.call().connect(
                     hostname=EXTERNAL_IP,
                     look_for_keys=False,
-                    pkey=mock_paramiko.RSAKey.generate.return_value,
+                    timeout=mock.ANY,
+                    banner_timeout=mock.ANY,
+                    pkey=mock_paramiko.Ed25519Key.return_value,
                     sock=None,
                     username="test-username",
                 ),
@@ -131,8 +149,8 @@ class TestComputeEngineHookWithPassedProjectId:
         mocker,
     ):
         mock_paramiko.SSHException = RuntimeError
-        mock_paramiko.RSAKey.generate.return_value.get_name.return_value = "NAME"
-        mock_paramiko.RSAKey.generate.return_value.get_base64.return_value = "AYZ"
+        mock_paramiko.Ed25519Key.return_value.get_name.return_value = "NAME"
+        mock_paramiko.Ed25519Key.return_value.get_base64.return_value = "AYZ"
 
         mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
         mock_compute_hook.return_value.get_instance_address.return_value = EXTERNAL_IP
@@ -164,8 +182,8 @@ class TestComputeEngineHookWithPassedProjectId:
         self, mock_ssh_client, mock_paramiko, mock_os_login_hook, mock_compute_hook
     ):
         mock_paramiko.SSHException = Exception
-        mock_paramiko.RSAKey.generate.return_value.get_name.return_value = "NAME"
-        mock_paramiko.RSAKey.generate.return_value.get_base64.return_value = "AYZ"
+        mock_paramiko.Ed25519Key.return_value.get_name.return_value = "NAME"
+        mock_paramiko.Ed25519Key.return_value.get_base64.return_value = "AYZ"
 
         mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
         mock_compute_hook.return_value.get_instance_address.return_value = EXTERNAL_IP
@@ -176,7 +194,7 @@ class TestComputeEngineHookWithPassedProjectId:
         result = hook.get_conn()
         assert mock_ssh_client.return_value == result
 
-        mock_paramiko.RSAKey.generate.assert_called_once_with(2048)
+        mock_paramiko.Ed25519Key.assert_called_once_with(file_obj=mock.ANY)
         mock_compute_hook.assert_has_calls(
             [
                 mock.call(gcp_conn_id="google_cloud_default"),
@@ -205,7 +223,9 @@ class TestComputeEngineHookWithPassedProjectId:
                 mock.call().connect(
                     hostname=EXTERNAL_IP,
                     look_for_keys=False,
-                    pkey=mock_paramiko.RSAKey.generate.return_value,
+                    timeout=mock.ANY,
+                    banner_timeout=mock.ANY,
+                    pkey=mock_paramiko.Ed25519Key.return_value,
                     sock=None,
                     username="root",
                 ),
@@ -243,8 +263,8 @@ class TestComputeEngineHookWithPassedProjectId:
         caplog,
     ):
         mock_paramiko.SSHException = Exception
-        mock_paramiko.RSAKey.generate.return_value.get_name.return_value = "NAME"
-        mock_paramiko.RSAKey.generate.return_value.get_base64.return_value = "AYZ"
+        mock_paramiko.Ed25519Key.return_value.get_name.return_value = "NAME"
+        mock_paramiko.Ed25519Key.return_value.get_base64.return_value = "AYZ"
 
         mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
         mock_compute_hook.return_value.get_instance_address.return_value = EXTERNAL_IP
@@ -256,7 +276,10 @@ class TestComputeEngineHookWithPassedProjectId:
         with caplog.at_level(logging.INFO):
             hook.get_conn()
         assert error_message in caplog.text
-        assert "Failed establish SSH connection" in caplog.text
+        assert "Failed to update instance metadata" in caplog.text
+        assert mock_compute_hook.return_value.get_instance_info.call_count == 2
+        assert mock_compute_hook.return_value.set_instance_metadata.call_count == 2
+        mock_ssh_client.return_value.connect.assert_called_once()
 
     @pytest.mark.db_test
     @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
@@ -268,8 +291,8 @@ class TestComputeEngineHookWithPassedProjectId:
     ):
         del mock_os_login_hook
         mock_paramiko.SSHException = Exception
-        mock_paramiko.RSAKey.generate.return_value.get_name.return_value = "NAME"
-        mock_paramiko.RSAKey.generate.return_value.get_base64.return_value = "AYZ"
+        mock_paramiko.Ed25519Key.return_value.get_name.return_value = "NAME"
+        mock_paramiko.Ed25519Key.return_value.get_base64.return_value = "AYZ"
 
         mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
         mock_compute_hook.return_value.get_instance_address.return_value = EXTERNAL_IP
@@ -297,8 +320,8 @@ class TestComputeEngineHookWithPassedProjectId:
     def test_get_conn_private_ip(self, mock_ssh_client, mock_paramiko, mock_os_login_hook, mock_compute_hook):
         del mock_os_login_hook
         mock_paramiko.SSHException = Exception
-        mock_paramiko.RSAKey.generate.return_value.get_name.return_value = "NAME"
-        mock_paramiko.RSAKey.generate.return_value.get_base64.return_value = "AYZ"
+        mock_paramiko.Ed25519Key.return_value.get_name.return_value = "NAME"
+        mock_paramiko.Ed25519Key.return_value.get_base64.return_value = "AYZ"
 
         mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
         mock_compute_hook.return_value.get_instance_address.return_value = INTERNAL_IP
@@ -315,7 +338,13 @@ class TestComputeEngineHookWithPassedProjectId:
             project_id=TEST_PROJECT_ID, resource_id=TEST_INSTANCE_NAME, use_internal_ip=True, zone=TEST_ZONE
         )
         mock_ssh_client.return_value.connect.assert_called_once_with(
-            hostname=INTERNAL_IP, look_for_keys=mock.ANY, pkey=mock.ANY, sock=mock.ANY, username=mock.ANY
+            hostname=INTERNAL_IP,
+            look_for_keys=mock.ANY,
+            pkey=mock.ANY,
+            sock=mock.ANY,
+            username=mock.ANY,
+            timeout=mock.ANY,
+            banner_timeout=mock.ANY,
         )
 
     @pytest.mark.db_test
@@ -345,6 +374,8 @@ class TestComputeEngineHookWithPassedProjectId:
             pkey=mock.ANY,
             sock=mock.ANY,
             username=mock.ANY,
+            timeout=mock.ANY,
+            banner_timeout=mock.ANY,
         )
 
     @pytest.mark.db_test
@@ -370,6 +401,8 @@ class TestComputeEngineHookWithPassedProjectId:
             pkey=mock.ANY,
             sock=mock_paramiko.ProxyCommand.return_value,
             username=mock.ANY,
+            timeout=mock.ANY,
+            banner_timeout=mock.ANY,
         )
         mock_paramiko.ProxyCommand.assert_called_once_with(
             f"gcloud compute start-iap-tunnel {TEST_INSTANCE_NAME} 22 "
@@ -406,6 +439,8 @@ class TestComputeEngineHookWithPassedProjectId:
             pkey=mock.ANY,
             sock=mock_paramiko.ProxyCommand.return_value,
             username=mock.ANY,
+            timeout=mock.ANY,
+            banner_timeout=mock.ANY,
         )
         mock_paramiko.ProxyCommand.assert_called_once_with(
             f"gcloud compute start-iap-tunnel {TEST_INSTANCE_NAME} 22 "
@@ -560,3 +595,530 @@ class TestComputeEngineHookWithPassedProjectId:
             mock_set_instance_metadata.call_args.kwargs["metadata"]["items"].sort(key=lambda x: x["key"])
             expected_metadata["items"].sort(key=lambda x: x["key"])
             assert mock_set_instance_metadata.call_args.kwargs["metadata"] == expected_metadata
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch(
+        "airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._load_connection_config"
+    )
+    def test_get_conn_reuses_pooled_connection(self, mock_load_config, mock_connect, mock_compute_hook):
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME,
+            zone=TEST_ZONE,
+            project_id=TEST_PROJECT_ID,
+            hostname=EXTERNAL_IP,
+        )
+        pooled_client = mock.MagicMock()
+        pooled_client.get_transport.return_value.is_active.return_value = True
+        pooled_client.get_transport.return_value.sock.process.poll.return_value = None
+        compute_ssh._SSH_POOL[hook._get_pool_key(EXTERNAL_IP)] = compute_ssh.deque([pooled_client])
+
+        assert hook.get_conn() is pooled_client
+        mock_connect.assert_not_called()
+        pooled_client.get_transport.return_value.send_ignore.assert_called_once_with()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch(
+        "airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._load_connection_config"
+    )
+    def test_get_conn_skips_stale_pooled_connection(self, mock_load_config, mock_connect, mock_compute_hook):
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME,
+            zone=TEST_ZONE,
+            project_id=TEST_PROJECT_ID,
+            hostname=EXTERNAL_IP,
+            use_oslogin=False,
+        )
+        stale_client = mock.MagicMock()
+        stale_client.get_transport.return_value.is_active.return_value = False
+        compute_ssh._SSH_POOL[hook._get_pool_key(EXTERNAL_IP)] = compute_ssh.deque([stale_client])
+
+        result = hook.get_conn()
+
+        assert result is mock_connect.return_value
+        stale_client.close.assert_called_once_with()
+        assert result.pool_key == hook._get_pool_key(EXTERNAL_IP)
+
+    def test_close_pool(self):
+        pooled_client = mock.MagicMock()
+        compute_ssh._SSH_POOL[("host",)] = compute_ssh.deque([pooled_client])
+
+        ComputeEngineSSHHook.close_pool()
+
+        pooled_client.close.assert_called_once_with()
+        assert pooled_client.pool_key is None
+        assert not compute_ssh._SSH_POOL
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._generate_ssh_key")
+    def test_get_ssh_key_is_cached(self, mock_generate_ssh_key):
+        mock_generate_ssh_key.return_value = (mock.sentinel.pkey, "pubkey")
+        hook = ComputeEngineSSHHook()
+
+        assert hook._get_ssh_key("root") == (mock.sentinel.pkey, "pubkey")
+        assert hook._get_ssh_key("root") == (mock.sentinel.pkey, "pubkey")
+        mock_generate_ssh_key.assert_called_once_with("root")
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.monotonic")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._generate_ssh_key")
+    def test_get_ssh_key_regenerated_before_expiration(self, mock_generate_ssh_key, mock_monotonic):
+        mock_generate_ssh_key.side_effect = [
+            (mock.sentinel.pkey1, "pubkey1"),
+            (mock.sentinel.pkey2, "pubkey2"),
+        ]
+        mock_monotonic.side_effect = [0, 250, 250]
+        hook = ComputeEngineSSHHook(expire_time=300)
+
+        assert hook._get_ssh_key("root") == (mock.sentinel.pkey1, "pubkey1")
+        assert hook._get_ssh_key("root") == (mock.sentinel.pkey2, "pubkey2")
+        assert mock_generate_ssh_key.call_count == 2
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.monotonic")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.time")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._generate_ssh_key")
+    def test_short_expire_time_keeps_key_usable(self, mock_generate_ssh_key, mock_time, mock_monotonic):
+        mock_generate_ssh_key.return_value = (mock.sentinel.pkey, "pubkey")
+        mock_time.return_value = 1000
+        mock_monotonic.side_effect = [0, 10]
+        hook = ComputeEngineSSHHook(expire_time=30)
+        hook._oslogin_key = ("pubkey", "test-username", 1000 + 30)
+
+        assert hook._key_expiry_margin == 15
+        assert not hook._is_oslogin_key_expiring()
+        assert hook._get_ssh_key("root") == (mock.sentinel.pkey, "pubkey")
+        assert hook._get_ssh_key("root") == (mock.sentinel.pkey, "pubkey")
+        mock_generate_ssh_key.assert_called_once_with("root")
+
+    @pytest.mark.parametrize(
+        "retry, expected_delay",
+        [(0, 1.0), (1, 2.0), (3, 8.0), (5, 30.0), (9, 30.0)],
+    )
+    def test_get_retry_delay_without_jitter(self, retry, expected_delay):
+        hook = ComputeEngineSSHHook(jitter=False)
+        assert hook._get_retry_delay(retry) == expected_delay
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.random.random", return_value=0.5)
+    def test_get_retry_delay_with_jitter(self, mock_random):
+        hook = ComputeEngineSSHHook(base_delay=2.0, max_delay=10.0)
+        assert hook._get_retry_delay(1) == 3.0
+        assert hook._get_retry_delay(4) == 7.5
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
+    def test_resolved_hostname_is_cached_until_refresh(self, mock_compute_hook):
+        mock_compute_hook.return_value.get_instance_address.return_value = EXTERNAL_IP
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE, project_id=TEST_PROJECT_ID
+        )
+
+        assert hook._resolved_hostname == EXTERNAL_IP
+        assert hook._resolved_hostname == EXTERNAL_IP
+        mock_compute_hook.return_value.get_instance_address.assert_called_once()
+
+        hook.refresh()
+        assert hook._resolved_hostname == EXTERNAL_IP
+        assert mock_compute_hook.return_value.get_instance_address.call_count == 2
+
+    def test_load_connection_config_only_once(self):
+        conn_uri = Connection(conn_type="gcpssh", extra=json.dumps({})).get_uri()
+        with (
+            mock.patch.dict("os.environ", AIRFLOW_CONN_GCPSSH=conn_uri),
+            mock.patch.object(
+                ComputeEngineSSHHook, "get_connection", wraps=ComputeEngineSSHHook.get_connection
+            ) as mock_get_connection,
+        ):
+            hook = ComputeEngineSSHHook(gcp_conn_id="gcpssh")
+            hook._load_connection_config()
+            hook._load_connection_config()
+            mock_get_connection.assert_called_once_with("gcpssh")
+
+            hook.refresh()
+            hook._load_connection_config()
+            assert mock_get_connection.call_count == 2
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._authorize")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._get_ssh_key")
+    def test_get_authorized_key_waits_for_inflight_authorization(self, mock_get_ssh_key, mock_authorize):
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE, project_id=TEST_PROJECT_ID
+        )
+        future: Future = Future()
+        future.set_result(("test-username", mock.sentinel.pkey))
+        ComputeEngineSSHHook._INFLIGHT[
+            (TEST_INSTANCE_NAME, TEST_ZONE, TEST_PROJECT_ID, "root", True, "google_cloud_default", None)
+        ] = future
+
+        assert hook._get_authorized_key() == ("test-username", mock.sentinel.pkey)
+        mock_get_ssh_key.assert_not_called()
+        mock_authorize.assert_not_called()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._authorize")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._get_ssh_key")
+    def test_get_authorized_key_clears_inflight_on_error(self, mock_get_ssh_key, mock_authorize):
+        mock_get_ssh_key.return_value = (mock.sentinel.pkey, "pubkey")
+        mock_authorize.side_effect = AirflowException("error")
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE, project_id=TEST_PROJECT_ID
+        )
+
+        with pytest.raises(AirflowException, match="error"):
+            hook._get_authorized_key()
+        assert not ComputeEngineSSHHook._INFLIGHT
+
+    @pytest.mark.db_test
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    def test_get_conn_authorizes_once_on_connection_error(self, mock_connect, mock_sleep, mock_compute_hook):
+        mock_compute_hook.return_value.project_id = TEST_PROJECT_ID
+        mock_compute_hook.return_value.get_instance_info.return_value = {"metadata": {}}
+        mock_connect.side_effect = [SSHException, SSHException, mock.MagicMock()]
+
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE, use_oslogin=False, hostname=EXTERNAL_IP
+        )
+        hook.get_conn()
+
+        assert mock_connect.call_count == 3
+        mock_compute_hook.return_value.set_instance_metadata.assert_called_once()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.paramiko")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh._GCloudAuthorizedSSHClient")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.monotonic")
+    def test_connect_to_instance_stops_at_deadline(
+        self, mock_monotonic, mock_sleep, mock_ssh_client, mock_paramiko
+    ):
+        class CustomException(Exception):
+            pass
+
+        mock_paramiko.SSHException = CustomException
+        mock_ssh_client.return_value.connect.side_effect = CustomException
+        mock_monotonic.side_effect = [0, 0, 10, 10, 29.9, 29.9, 30]
+        hook = ComputeEngineSSHHook(handshake_timeout=30, jitter=False)
+
+        with pytest.raises(CustomException):
+            hook._connect_to_instance("user", EXTERNAL_IP, mock.sentinel.pkey, None)
+
+        assert mock_ssh_client.return_value.connect.call_count == 3
+        first_call_kwargs = mock_ssh_client.return_value.connect.call_args_list[0].kwargs
+        assert first_call_kwargs["timeout"] == 30
+        assert first_call_kwargs["banner_timeout"] == 30
+        assert mock_sleep.call_count == 2
+        assert mock_sleep.call_args_list[0] == mock.call(1.0)
+        assert mock_sleep.call_args_list[1][0][0] == pytest.approx(0.1)
+
+    @pytest.mark.parametrize(
+        "key_type, key_class",
+        [("ed25519", "Ed25519Key"), ("rsa", "RSAKey")],
+    )
+    def test_generate_ssh_key(self, key_type, key_class):
+        hook = ComputeEngineSSHHook(key_type=key_type)
+        pkey, pubkey = hook._generate_ssh_key("root")
+
+        assert type(pkey).__name__ == key_class
+        assert pubkey == f"{pkey.get_name()} {pkey.get_base64()} root"
+
+    def test_unsupported_key_type(self):
+        with pytest.raises(ValueError, match="Unsupported key_type"):
+            ComputeEngineSSHHook(key_type="dsa")
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.paramiko")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh._GCloudAuthorizedSSHClient")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    def test_connect_to_instance_closes_client_on_error(self, mock_sleep, mock_ssh_client, mock_paramiko):
+        class CustomException(Exception):
+            pass
+
+        mock_paramiko.SSHException = CustomException
+        failed_client, client = mock.MagicMock(), mock.MagicMock()
+        failed_client.connect.side_effect = CustomException
+        mock_ssh_client.side_effect = [failed_client, client]
+        hook = ComputeEngineSSHHook()
+
+        assert hook._connect_to_instance("user", EXTERNAL_IP, mock.sentinel.pkey, "proxy-command") is client
+
+        mock_paramiko.ProxyCommand.assert_has_calls([mock.call("proxy-command"), mock.call("proxy-command")])
+        failed_client.close.assert_called_once_with()
+        client.close.assert_not_called()
+
+    @pytest.mark.asyncio
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.asyncio.sleep")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._get_authorized_key")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._prepare_connect_args")
+    async def test_aget_conn(self, mock_prepare, mock_authorize, mock_connect, mock_sleep):
+        mock_prepare.return_value = (EXTERNAL_IP, None)
+        mock_authorize.return_value = ("test-username", mock.sentinel.pkey)
+        client = mock.MagicMock()
+        mock_connect.side_effect = [SSHException, client]
+
+        hook = ComputeEngineSSHHook(instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE)
+        result = await hook.aget_conn()
+
+        assert result is client
+        assert mock_connect.call_count == 2
+        mock_connect.assert_called_with("test-username", EXTERNAL_IP, mock.sentinel.pkey, None)
+        mock_sleep.assert_awaited_once()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._prepare_connect_args")
+    def test_get_session_shares_transport(self, mock_prepare, mock_connect):
+        mock_prepare.return_value = (EXTERNAL_IP, None)
+        transport = mock_connect.return_value.get_transport.return_value
+        transport.is_active.return_value = True
+        transport.sock.process.poll.return_value = None
+        hook = ComputeEngineSSHHook(instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE)
+
+        assert hook.get_session() == transport.open_session.return_value
+        assert hook.get_session() == transport.open_session.return_value
+
+        mock_connect.assert_called_once_with(EXTERNAL_IP)
+        assert transport.open_session.call_count == 2
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._prepare_connect_args")
+    def test_get_session_reconnects_inactive_transport(self, mock_prepare, mock_connect):
+        mock_prepare.return_value = (EXTERNAL_IP, None)
+        inactive_client, active_client = mock.MagicMock(), mock.MagicMock()
+        inactive_client.get_transport.return_value.is_active.return_value = False
+        mock_connect.side_effect = [inactive_client, active_client]
+        hook = ComputeEngineSSHHook(instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE)
+
+        hook.get_session()
+        session = hook.get_session()
+
+        assert session == active_client.get_transport.return_value.open_session.return_value
+        inactive_client.close.assert_called_once_with()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._authorize_os_login")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.time")
+    def test_authorize_reuses_imported_oslogin_key(self, mock_time, mock_authorize_os_login):
+        mock_time.return_value = 1000
+        hook = ComputeEngineSSHHook()
+        hook._oslogin_key = ("pubkey", "test-username", 1200)
+
+        assert hook._authorize("pubkey") == "test-username"
+        mock_authorize_os_login.assert_not_called()
+
+        hook._oslogin_key = ("pubkey", "test-username", 1030)
+        assert hook._authorize("pubkey") == mock_authorize_os_login.return_value
+        mock_authorize_os_login.assert_called_once_with("pubkey")
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._get_authorized_key")
+    def test_connect_reimports_expiring_oslogin_key(self, mock_authorize, mock_connect, mock_sleep):
+        hook = ComputeEngineSSHHook()
+        keys = iter([("pubkey1", mock.sentinel.pkey1, 10), ("pubkey2", mock.sentinel.pkey2, 300)])
+
+        def authorize():
+            pubkey, pkey, expires_in = next(keys)
+            hook._oslogin_key = (pubkey, "test-username", compute_ssh.time.time() + expires_in)
+            return "test-username", pkey
+
+        mock_authorize.side_effect = authorize
+        mock_connect.side_effect = [SSHException, mock.sentinel.client]
+
+        assert hook._connect(EXTERNAL_IP) == mock.sentinel.client
+        assert mock_authorize.call_count == 2
+        assert mock_connect.call_args_list == [
+            mock.call("test-username", EXTERNAL_IP, mock.sentinel.pkey2, None),
+            mock.call("test-username", EXTERNAL_IP, mock.sentinel.pkey2, None),
+        ]
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._get_authorized_key")
+    def test_connect_keeps_valid_oslogin_key(self, mock_authorize, mock_connect, mock_sleep):
+        hook = ComputeEngineSSHHook()
+
+        def authorize():
+            hook._oslogin_key = ("pubkey", "test-username", compute_ssh.time.time() + 300)
+            return "test-username", mock.sentinel.pkey
+
+        mock_authorize.side_effect = authorize
+        mock_connect.side_effect = [SSHException, mock.sentinel.client]
+
+        assert hook._connect(EXTERNAL_IP) == mock.sentinel.client
+        mock_authorize.assert_called_once_with()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    def test_metadata_cas_retry_gives_up_after_attempts(self, mock_sleep):
+        fn = mock.MagicMock(side_effect=AirflowException("412 PRECONDITION FAILED"))
+        hook = ComputeEngineSSHHook()
+
+        with pytest.raises(AirflowException, match="Maximum retries exceeded") as ctx:
+            hook._metadata_cas_retry(fn, attempts=3)
+        assert fn.call_count == 3
+        assert mock_sleep.call_count == 2
+        assert "412 PRECONDITION FAILED" in str(ctx.value.__cause__)
+
+    def test_metadata_cas_retry_rejects_non_positive_attempts(self):
+        fn = mock.MagicMock()
+        hook = ComputeEngineSSHHook()
+
+        with pytest.raises(ValueError, match="attempts must be a positive integer"):
+            hook._metadata_cas_retry(fn, attempts=0)
+        fn.assert_not_called()
+
+    def test_metadata_cas_retry_raises_other_errors(self):
+        fn = mock.MagicMock(side_effect=AirflowException("403 FORBIDDEN"))
+        hook = ComputeEngineSSHHook()
+
+        with pytest.raises(AirflowException, match="403 FORBIDDEN"):
+            hook._metadata_cas_retry(fn, attempts=3)
+        fn.assert_called_once_with()
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    @mock.patch(
+        "airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._append_ssh_key_to_instance_metadata"
+    )
+    def test_authorize_compute_engine_instance_metadata_uses_max_retries(self, mock_append, mock_sleep):
+        mock_append.side_effect = AirflowException("412 PRECONDITION FAILED")
+        hook = ComputeEngineSSHHook(max_retries=12)
+
+        with pytest.raises(AirflowException, match="Maximum retries exceeded"):
+            hook._authorize_compute_engine_instance_metadata("pubkey")
+        assert mock_append.call_count == 13
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.paramiko")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh._GCloudAuthorizedSSHClient")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.time.sleep")
+    def test_connect_to_instance_without_jitter(self, mock_sleep, mock_ssh_client, mock_paramiko):
+        class CustomException(Exception):
+            pass
+
+        mock_paramiko.SSHException = CustomException
+        mock_ssh_client.return_value.connect.side_effect = [CustomException, CustomException, True]
+        hook = ComputeEngineSSHHook(jitter=False)
+
+        hook._connect_to_instance("user", EXTERNAL_IP, mock.sentinel.pkey, None)
+
+        assert mock_sleep.call_args_list == [mock.call(1.0), mock.call(2.0)]
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch(
+        "airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._load_connection_config"
+    )
+    def test_get_conn_skips_pooled_connection_with_exited_tunnel(
+        self, mock_load_config, mock_connect, mock_compute_hook
+    ):
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME,
+            zone=TEST_ZONE,
+            project_id=TEST_PROJECT_ID,
+            hostname=EXTERNAL_IP,
+            use_oslogin=False,
+            use_iap_tunnel=True,
+        )
+        pooled_client = mock.MagicMock()
+        pooled_client.get_transport.return_value.is_active.return_value = True
+        pooled_client.get_transport.return_value.sock.process.poll.return_value = 1
+        compute_ssh._SSH_POOL[hook._get_pool_key(EXTERNAL_IP)] = compute_ssh.deque([pooled_client])
+
+        assert hook.get_conn() is mock_connect.return_value
+        pooled_client.close.assert_called_once_with()
+
+    def test_reap_proxy_command_kills_hanging_process(self):
+        sock = mock.MagicMock()
+        sock.process.wait.side_effect = [compute_ssh.subprocess.TimeoutExpired("cmd", 5), 0]
+
+        compute_ssh._reap_proxy_command(sock)
+
+        sock.process.kill.assert_called_once_with()
+        assert sock.process.wait.call_count == 2
+
+    @pytest.mark.parametrize(
+        "conn_type, extra, cmd_timeout, expected_cmd_timeout",
+        [
+            ("gcpssh", {"cmd_timeout": "2.5"}, NOTSET, 2.5),
+            ("gcpssh", {"cmd_timeout": ""}, NOTSET, None),
+            ("gcpssh", {"cmd_timeout": "2.5"}, 30, 30),
+            ("gcpssh", {}, NOTSET, compute_ssh.CMD_TIMEOUT),
+            ("google_cloud_platform", {}, NOTSET, compute_ssh.CMD_TIMEOUT),
+        ],
+    )
+    def test_read_cmd_timeout_from_connection(self, conn_type, extra, cmd_timeout, expected_cmd_timeout):
+        conn_uri = Connection(conn_type=conn_type, extra=json.dumps(extra)).get_uri()
+        with mock.patch.dict("os.environ", AIRFLOW_CONN_GCPSSH=conn_uri):
+            hook = ComputeEngineSSHHook(gcp_conn_id="gcpssh", cmd_timeout=cmd_timeout)
+            hook._load_connection_config()
+        assert hook.cmd_timeout == expected_cmd_timeout
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh._is_client_alive", return_value=True)
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.paramiko.SSHClient.connect")
+    def test_pooled_close_restores_environment(self, mock_connect, mock_is_client_alive):
+        @contextmanager
+        def provide_authorized_gcloud():
+            with mock.patch.dict("os.environ", CLOUDSDK_CONFIG="/tmp/gcloud-config"):
+                yield
+
+        google_hook = mock.MagicMock()
+        google_hook.provide_authorized_gcloud.side_effect = provide_authorized_gcloud
+        environ = dict(os.environ)
+        pool_key = ("host",)
+
+        client = compute_ssh._GCloudAuthorizedSSHClient(google_hook)
+        client.connect(hostname=EXTERNAL_IP, sock=None)
+        assert dict(os.environ) == environ
+
+        client.pool_key = pool_key
+        client.close()
+
+        assert list(compute_ssh._SSH_POOL[pool_key]) == [client]
+        assert client.decorator is None
+        assert dict(os.environ) == environ
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh._is_client_alive", return_value=True)
+    def test_pooled_close_twice_releases_once(self, mock_is_client_alive):
+        pool_key = ("host",)
+        client = compute_ssh._GCloudAuthorizedSSHClient(mock.MagicMock())
+        client.pool_key = pool_key
+
+        with client:
+            pass
+        client.close()
+
+        assert list(compute_ssh._SSH_POOL[pool_key]) == [client]
+        assert compute_ssh._acquire_ssh_client(pool_key) is client
+        assert compute_ssh._acquire_ssh_client(pool_key) is None
+
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineHook")
+    def test_authorize_compute_engine_instance_metadata_skips_present_key(self, mock_compute_hook):
+        mock_compute_hook.return_value.get_instance_info.return_value = {
+            "metadata": {"items": [{"key": "ssh-keys", "value": "other:key\nuser:pubkey\n"}]}
+        }
+        hook = ComputeEngineSSHHook(
+            instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE, project_id=TEST_PROJECT_ID
+        )
+        hook.user = "user"
+
+        hook._authorize_compute_engine_instance_metadata(pubkey="pubkey")
+
+        mock_compute_hook.return_value.set_instance_metadata.assert_not_called()
+
+    @pytest.mark.asyncio
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.asyncio.sleep")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._connect_to_instance")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._get_authorized_key")
+    @mock.patch("airflow.providers.google.cloud.hooks.compute_ssh.ComputeEngineSSHHook._prepare_connect_args")
+    async def test_aget_conn_reimports_expiring_oslogin_key(
+        self, mock_prepare, mock_authorize, mock_connect, mock_sleep
+    ):
+        mock_prepare.return_value = (EXTERNAL_IP, None)
+        hook = ComputeEngineSSHHook(instance_name=TEST_INSTANCE_NAME, zone=TEST_ZONE)
+        keys = iter([("pubkey1", mock.sentinel.pkey1, 10), ("pubkey2", mock.sentinel.pkey2, 300)])
+
+        def authorize():
+            pubkey, pkey, expires_in = next(keys)
+            hook._oslogin_key = (pubkey, "test-username", compute_ssh.time.time() + expires_in)
+            return "test-username", pkey
+
+        mock_authorize.side_effect = authorize
+        client = mock.MagicMock()
+        mock_connect.side_effect = [SSHException, client]
+
+        assert await hook.aget_conn() is client
+        assert mock_authorize.call_count == 2
+        mock_connect.assert_called_with("test-username", EXTERNAL_IP, mock.sentinel.pkey2, None)